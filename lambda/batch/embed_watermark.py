@@ -1,7 +1,7 @@
-import importlib.util
 import json
 import logging
 import os
+import sys
 import tempfile
 from typing import Any, Dict, Optional, Union
 from io import BytesIO
@@ -9,36 +9,31 @@ from io import BytesIO
 import boto3
 from PIL import Image
 
+# The parent directory can't be named in an import statement ("lambda" is a
+# keyword), so put it on sys.path once and let the import system handle the
+# rest - plain imports get cached in sys.modules and reuse __pycache__,
+# unlike the spec_from_file_location shims this replaces.
+_PARENT_DIR = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+if _PARENT_DIR not in sys.path:
+    sys.path.insert(0, _PARENT_DIR)
+
 # Import progress utilities
-progress_utils_spec = importlib.util.spec_from_file_location(
-    "progress_utils",
-    os.path.join(os.path.dirname(__file__), "..", "common", "progress_utils.py"),
-)
-if progress_utils_spec and progress_utils_spec.loader:
-    progress_utils = importlib.util.module_from_spec(progress_utils_spec)
-    progress_utils_spec.loader.exec_module(progress_utils)
-    update_progress = progress_utils.update_progress
-    mark_failed = progress_utils.mark_failed
-else:
+try:
+    from common.progress_utils import mark_failed, update_progress
+except ImportError:
     def update_progress(task_id, status, progress, message, error=None):
         pass
     def mark_failed(task_id, error_message, progress=0):
         pass
 
-# Import common watermark utilities using importlib to avoid lambda keyword issues
-watermark_utils_spec = importlib.util.spec_from_file_location(
-    "watermark_utils",
-    os.path.join(os.path.dirname(__file__), "..", "common", "watermark_utils.py"),
-)
-if watermark_utils_spec and watermark_utils_spec.loader:
-    watermark_utils = importlib.util.module_from_spec(watermark_utils_spec)
-    watermark_utils_spec.loader.exec_module(watermark_utils)
-
-    # Make functions available in current module
-    extract_nano_id_from_watermark = watermark_utils.extract_nano_id_from_watermark
-    embed_watermark_to_image_data = watermark_utils.embed_watermark_to_image_data
-    verify_watermark_embedding = watermark_utils.verify_watermark_embedding
-else:
+# Import common watermark utilities
+try:
+    from common.watermark_utils import (
+        embed_watermark_to_image_data,
+        extract_nano_id_from_watermark,
+        verify_watermark_embedding,
+    )
+except ImportError:
     # Fallback: define dummy functions if import fails
     def extract_nano_id_from_watermark(image_data: bytes) -> Dict[str, Any]:
         return {"extractedId": None, "method": "trustmark_P_BCH5", "confidence": 0.0}
@@ -0,0 +1 @@
+"""Shared utilities for the Lambda handlers."""
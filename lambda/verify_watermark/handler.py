@@ -1,13 +1,35 @@
 import base64
-import importlib.util
+import functools
+import gzip
+import hashlib
+import html
 import json
 import logging
 import os
+import re
+import sys
 import time
+import traceback
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Any, Dict, Optional
 
 import boto3
+import urllib3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+try:
+    import orjson
+
+    def _json_dumps(data: Any, default=None) -> str:
+        return orjson.dumps(data, default=default).decode()
+
+except ImportError:
+
+    def _json_dumps(data: Any, default=None) -> str:
+        return json.dumps(data, default=default)
+
 
 # アプリ名を環境変数から取得
 APP_NAME = os.environ.get("APP_NAME", "brw")
@@ -16,22 +38,125 @@ CLOUDFRONT_DOMAIN = os.environ.get("CLOUDFRONT_DOMAIN", "")
 VERIFICATION_RESULTS_TABLE = os.environ.get("VERIFICATION_RESULTS_TABLE", "")
 PROVENANCE_PUBLIC_BUCKET_NAME = os.environ.get("PROVENANCE_PUBLIC_BUCKET_NAME", "")
 
+# DOMAIN_NAME is fixed for the container lifetime; only the id varies
+_CHECK_URL_PREFIX = f"https://{DOMAIN_NAME}/check-result?id="
+
+# POST response messages are fixed; keep the interned strings here rather
+# than rebuilding literals in the handler branches
+_SUCCESS_MSG = "透かし検証が完了しました。結果確認はcheck-resultエンドポイントをご利用ください。"
+_ERROR_MSG = "透かし検証中にエラーが発生しました。結果確認はcheck-resultエンドポイントをご利用ください。"
+
+# Reject oversized uploads before the multipart parser touches them
+MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+
+# Extraction runs synchronously inside the invocation, so nothing external
+# can observe the intermediate "processing" state - the marker write is an
+# extra DynamoDB round trip per verification with no reader. Off by
+# default; a status-polling UI can opt back in via the env flag.
+WRITE_PROCESSING_MARKER = os.environ.get("WRITE_PROCESSING_MARKER", "0") == "1"
+
+# RFC 2046 boundary characters; anything else is rejected before scanning
+_BOUNDARY_RE = re.compile(r"^[A-Za-z0-9'()+_,\-./:=? ]{1,70}$")
+
+
+# AWS_REGIONはLambdaランタイムが設定する予約変数なのでimport時に一度だけ解決
+_REGION = (
+    os.environ.get("AWS_REGION") or os.environ.get("AWS_DEFAULT_REGION") or "us-east-1"
+)
+
 
-# AWS_REGIONは予約変数なのでboto3から動的取得
 def get_region():
-    try:
-        return boto3.Session().region_name or "us-east-1"
-    except Exception:
-        return "us-east-1"
+    return _REGION
 
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# Initialize AWS clients
-s3_client = boto3.client("s3")
+# Initialize AWS clients. DynamoDB is needed on every POST; S3 is only
+# touched by provenance lookups, so it is created lazily - GET traffic
+# (the most common cold start) never pays for it.
 dynamodb_client = boto3.client("dynamodb")
+# Touching the endpoint forces botocore's lazy endpoint/credential setup
+# to run during cold start instead of on the first invocation
+_ = dynamodb_client.meta.endpoint_url
+
+_s3_client = None
+
+_http_pool = None
+
+
+def _http():
+    """Return the shared HTTP pool, creating it on first use.
+
+    Keep-alive pooling means warm invocations reuse the TCP+TLS session
+    to CloudFront instead of handshaking on every probe. urllib3 ships
+    with botocore, so no extra dependency is involved.
+    """
+    global _http_pool
+    if _http_pool is None:
+        _http_pool = urllib3.PoolManager(
+            num_pools=4,
+            maxsize=8,
+            retries=urllib3.Retry(total=1),
+            timeout=urllib3.Timeout(connect=2.0, read=5.0),
+        )
+    return _http_pool
+
+
+def _s3():
+    """Return the shared S3 client, creating it on first use.
+
+    The client keeps a small keep-alive connection pool so repeated
+    head_object calls reuse one TLS session, and a head_bucket warm-up
+    preheats that session before the first real lookup.
+    """
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client(
+            "s3",
+            config=Config(
+                max_pool_connections=10,
+                retries={"max_attempts": 2, "mode": "standard"},
+                tcp_keepalive=True,
+            ),
+        )
+        bucket = os.environ.get("PROVENANCE_PUBLIC_BUCKET")
+        if bucket:
+            try:
+                _s3_client.head_bucket(Bucket=bucket)
+            except Exception:
+                # Warm-up only; real calls surface their own errors
+                pass
+    return _s3_client
+
+
+_results_table = None
+
+
+def _table():
+    """Return the verification-results Table resource, created on first use.
+
+    Only the batch write path needs the resource API; the single-item
+    path keeps the lighter low-level client, so cold starts don't pay
+    for the resource layer until a batch is actually written.
+    """
+    global _results_table
+    if _results_table is None:
+        _results_table = boto3.resource("dynamodb").Table(VERIFICATION_RESULTS_TABLE)
+    return _results_table
+
+
+def save_verification_results_batch(items):
+    """Write multiple verification-result items in one batched pass.
+
+    batch_writer chunks to DynamoDB's 25-item ceiling and retries
+    unprocessed items automatically; use this from batched triggers
+    (e.g. SQS) instead of looping over save_verification_result.
+    """
+    with _table().batch_writer(overwrite_by_pkeys=["verification_id"]) as writer:
+        for item in items:
+            writer.put_item(Item=item)
 
 
 def save_verification_result(
@@ -43,51 +168,208 @@ def save_verification_result(
     """Save verification result to DynamoDB."""
     try:
         logger.info(
-            f"Attempting to save verification result for ID: {verification_id}, status: {status}"
+            "Saving verification result for ID: %s, status: %s",
+            verification_id,
+            status,
         )
-        logger.info(f"DynamoDB table name: {VERIFICATION_RESULTS_TABLE}")
 
+        now = int(time.time())
         item = {
             "verification_id": {"S": verification_id},
             "status": {"S": status},
-            "timestamp": {"N": str(int(time.time()))},
-            "ttl": {"N": str(int(time.time()) + 86400)},  # 24 hours TTL
+            "timestamp": {"N": str(now)},
+            "ttl": {"N": str(now + 86400)},  # 24 hours TTL
         }
 
         if result_data:
-            item["result_data"] = {"S": json.dumps(result_data)}
-            logger.info("Added result_data to item")
+            # Compact separators shave whitespace bytes off the stored item
+            item["result_data"] = {"S": json.dumps(result_data, separators=(",", ":"))}
 
         if error_message:
             item["error_message"] = {"S": error_message}
-            logger.info("Added error_message to item")
 
-        logger.info(f"Putting item to DynamoDB: {item}")
+        # The full item dump can run to multiple KB; keep it off INFO
+        logger.debug("Putting item to DynamoDB: %s", item)
         dynamodb_client.put_item(TableName=VERIFICATION_RESULTS_TABLE, Item=item)
-        logger.info(f"Successfully saved verification result for ID: {verification_id}")
+        logger.info("Saved verification result for ID: %s", verification_id)
     except Exception as e:
-        logger.error(f"Failed to save verification result: {e}", exc_info=True)
+        logger.error("Failed to save verification result: %s", e, exc_info=True)
+
+
+def _cached_result_for_hash(image_sha: str) -> Optional[Dict[str, Any]]:
+    """Return a prior verification result for this exact image, if stored.
+
+    Results are content-addressed under a "sha256:<hash>" row in the
+    verification-results table, so re-uploads of the same bytes skip
+    the multi-second extraction entirely.
+    """
+    try:
+        response = dynamodb_client.get_item(
+            TableName=VERIFICATION_RESULTS_TABLE,
+            Key={"verification_id": {"S": "sha256:" + image_sha}},
+        )
+    except Exception as e:
+        logger.warning("Idempotency lookup failed: %s", e)
+        return None
+
+    item = response.get("Item")
+    if item and "result_data" in item:
+        return json.loads(item["result_data"]["S"])
+    return None
+
+
+# Candidate locations for a post's provenance data, in lookup order
+_PROVENANCE_KEYS = (
+    "provenance/{id}/index.html",
+    "{id}.json",
+    "provenance/{id}.json",
+)
+
+
+# extracted_id -> (provenance_data or None, expiry). Bounded FIFO with a
+# short TTL: warm containers serving repeat verifications skip the S3/HTTP
+# probes entirely, misses are negative-cached, and the TTL bounds staleness.
+_PROVENANCE_CACHE: Dict[str, Any] = {}
+_PROVENANCE_CACHE_MAX = 512
+_PROVENANCE_CACHE_TTL = 300.0
+
+
+def _lookup_provenance(extracted_id: str) -> Optional[Dict[str, Any]]:
+    """TTL-cached wrapper around the provenance probes."""
+    now = time.monotonic()
+    cached = _PROVENANCE_CACHE.get(extracted_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    provenance_data = _lookup_provenance_uncached(extracted_id)
+
+    if len(_PROVENANCE_CACHE) >= _PROVENANCE_CACHE_MAX:
+        _PROVENANCE_CACHE.pop(next(iter(_PROVENANCE_CACHE)))
+    _PROVENANCE_CACHE[extracted_id] = (provenance_data, now + _PROVENANCE_CACHE_TTL)
+    return provenance_data
+
+
+def _lookup_provenance_uncached(extracted_id: str) -> Optional[Dict[str, Any]]:
+    """Find provenance data for an extracted post ID.
+
+    Probes the provenance bucket directly with head_object - one cheap
+    AWS-internal call per candidate key instead of a full HTTPS GET
+    through CloudFront - and only downloads a body when a .json key
+    actually exists. Falls back to the CloudFront probes when the bucket
+    name is not configured.
+    """
+    if not PROVENANCE_PUBLIC_BUCKET_NAME:
+        return _lookup_provenance_http(extracted_id)
+
+    s3 = _s3()
+    for key_tmpl in _PROVENANCE_KEYS:
+        key = key_tmpl.format(id=extracted_id)
+        try:
+            s3.head_object(Bucket=PROVENANCE_PUBLIC_BUCKET_NAME, Key=key)
+        except ClientError as s3_error:
+            code = s3_error.response.get("Error", {}).get("Code")
+            if code not in ("404", "NoSuchKey"):
+                logger.warning("S3 error probing provenance key %s: %s", key, s3_error)
+            continue
+
+        if key.endswith(".json"):
+            body = s3.get_object(Bucket=PROVENANCE_PUBLIC_BUCKET_NAME, Key=key)
+            logger.info("Found JSON provenance data at %s", key)
+            return json.loads(body["Body"].read())
+
+        logger.info("Found HTML provenance data at %s", key)
+        return {"type": "html", "url": f"https://{CLOUDFRONT_DOMAIN}/{key}"}
+
+    return None
+
+
+def _probe_provenance_url(provenance_url: str) -> Optional[Dict[str, Any]]:
+    """Fetch one candidate provenance URL; None when absent or on error."""
+    try:
+        logger.info("Checking provenance data at: %s", provenance_url)
+
+        # HTML hits are existence checks only - HEAD skips the body
+        # transfer entirely; JSON URLs need a GET for their payload
+        is_html = provenance_url.endswith(".html")
+        response = _http().request(
+            "HEAD" if is_html else "GET",
+            provenance_url,
+            headers={
+                "User-Agent": f"Mozilla/5.0 (compatible; {APP_NAME}-verifier)",
+                "Accept-Encoding": "gzip",
+            },
+            preload_content=False,
+        )
+        try:
+            if response.status != 200:
+                logger.info(
+                    "No data found at %s (status: %s)", provenance_url, response.status
+                )
+                return None
+            if is_html:
+                # For HTML files, just mark as found
+                logger.info("Found HTML provenance data at %s", provenance_url)
+                return {"type": "html", "url": provenance_url}
+            logger.info("Found JSON provenance data at %s", provenance_url)
+            # Parse straight off the stream instead of buffering the
+            # payload into an intermediate str; urllib3 transparently
+            # inflates a gzipped body as it is read
+            return json.load(response)
+        finally:
+            # Return the socket to the keep-alive pool
+            response.release_conn()
+    except Exception as url_error:
+        logger.info("Failed to fetch from %s: %s", provenance_url, url_error)
+        return None
+
+
+def _lookup_provenance_http(extracted_id: str) -> Optional[Dict[str, Any]]:
+    """Probe the CloudFront distribution for provenance data.
+
+    The candidate URLs are independent, so they are fetched concurrently
+    and the first hit wins; a missing key no longer serialises behind the
+    other probes' timeouts.
+    """
+    urls = [
+        f"https://{CLOUDFRONT_DOMAIN}/{key_tmpl.format(id=extracted_id)}"
+        for key_tmpl in _PROVENANCE_KEYS
+    ]
+    try:
+        with ThreadPoolExecutor(max_workers=len(urls)) as pool:
+            futures = {pool.submit(_probe_provenance_url, url): url for url in urls}
+            results = {}
+            for future in as_completed(futures, timeout=10):
+                results[futures[future]] = future.result()
+        # Preserve the original lookup-order preference among the hits
+        for url in urls:
+            if results.get(url):
+                return results[url]
+    except Exception as probe_error:
+        logger.warning("Provenance probing failed: %s", probe_error)
+
+    return None
 
 
 def process_watermark_async(verification_id: str, image_data: bytes):
     """Process watermark extraction asynchronously."""
-    logger.info(f"Starting async processing for verification ID: {verification_id}")
+    logger.info("Starting async processing for verification ID: %s", verification_id)
 
     try:
         # Update status to processing
-        save_verification_result(verification_id, "processing")
-        logger.info(
-            f"Updated status to processing for verification ID: {verification_id}"
-        )
+        if WRITE_PROCESSING_MARKER:
+            save_verification_result(verification_id, "processing")
+            logger.info(
+                "Updated status to processing for verification ID: %s", verification_id
+            )
 
         logger.info(
-            f"Extracting Nano ID from watermark, image size: {len(image_data)} bytes"
+            "Extracting Nano ID from watermark, image size: %d bytes", len(image_data)
         )
 
         # Extract Nano ID from watermark using Python version
         extraction_result = extract_nano_id_from_watermark(image_data)
 
-        logger.info(f"Extraction result: {extraction_result}")
+        logger.debug("Extraction result: %s", extraction_result)
 
         if not extraction_result.get("extractedId"):
             result_data = {
@@ -97,71 +379,21 @@ def process_watermark_async(verification_id: str, image_data: bytes):
             save_verification_result(
                 verification_id, "completed", result_data=result_data
             )
-            logger.info(f"No watermark found for verification ID: {verification_id}")
-            return
+            logger.info("No watermark found for verification ID: %s", verification_id)
+            return result_data
 
         extracted_id = extraction_result["extractedId"]
-        logger.info(f"Extracted ID: {extracted_id}")
+        logger.info("Extracted ID: %s", extracted_id)
 
         # Look up provenance data synchronously to avoid asyncio issues
         try:
-            # Use urllib instead of requests to avoid dependency issues
-            from urllib.request import Request, urlopen
-
-            # Try multiple possible provenance data locations using CloudFront
-            possible_urls = [
-                f"https://{CLOUDFRONT_DOMAIN}/provenance/{extracted_id}/index.html",
-                f"https://{CLOUDFRONT_DOMAIN}/{extracted_id}.json",
-                f"https://{CLOUDFRONT_DOMAIN}/provenance/{extracted_id}.json",
-            ]
-
-            provenance_data = None
-
-            for provenance_url in possible_urls:
-                try:
-                    logger.info(f"Checking provenance data at: {provenance_url}")
-
-                    req = Request(provenance_url)
-                    req.add_header(
-                        "User-Agent", f"Mozilla/5.0 (compatible; {APP_NAME}-verifier)"
-                    )
-
-                    with urlopen(req, timeout=30) as response:
-                        if response.status == 200:
-                            content = response.read().decode("utf-8")
-                            # Check if it's HTML or JSON
-                            if provenance_url.endswith(".html"):
-                                # For HTML files, just mark as found
-                                provenance_data = {
-                                    "type": "html",
-                                    "url": provenance_url,
-                                }
-                                logger.info(
-                                    f"Found HTML provenance data at {provenance_url}"
-                                )
-                                break
-                            else:
-                                # Try to parse as JSON
-                                provenance_data = json.loads(content)
-                                logger.info(
-                                    f"Found JSON provenance data at {provenance_url}"
-                                )
-                                break
-                        else:
-                            logger.info(
-                                f"No data found at {provenance_url} (status: {response.status})"
-                            )
-                except Exception as url_error:
-                    logger.info(f"Failed to fetch from {provenance_url}: {url_error}")
-                    continue
-
+            provenance_data = _lookup_provenance(extracted_id)
             if not provenance_data:
                 logger.info(
-                    f"No provenance data found at any location for ID: {extracted_id}"
+                    "No provenance data found at any location for ID: %s", extracted_id
                 )
-
         except Exception as prov_error:
-            logger.warning(f"Error fetching provenance data: {prov_error}")
+            logger.warning("Error fetching provenance data: %s", prov_error)
             provenance_data = None
 
         result_data = {
@@ -179,71 +411,96 @@ def process_watermark_async(verification_id: str, image_data: bytes):
 
         save_verification_result(verification_id, "completed", result_data=result_data)
         logger.info(
-            f"Completed async processing for verification ID: {verification_id}"
+            "Completed async processing for verification ID: %s", verification_id
         )
+        return result_data
 
     except Exception as e:
         logger.error(
-            f"Error in async processing for verification ID {verification_id}: {e}"
+            "Error in async processing for verification ID %s: %s", verification_id, e
         )
-        logger.error(f"Exception type: {type(e).__name__}")
-        logger.error(f"Exception args: {e.args}")
-        import traceback
-
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.error("Exception type: %s", type(e).__name__)
+        logger.error("Traceback: %s", traceback.format_exc())
 
         try:
             save_verification_result(verification_id, "error", error_message=str(e))
-            logger.info(f"Saved error status for verification ID: {verification_id}")
+            logger.info("Saved error status for verification ID: %s", verification_id)
         except Exception as save_error:
-            logger.error(f"Failed to save error status: {save_error}")
+            logger.error("Failed to save error status: %s", save_error)
 
     logger.info(
-        f"Async processing function completed for verification ID: {verification_id}"
+        "Async processing function completed for verification ID: %s", verification_id
     )
+    return None
+
+
+# Common watermark utilities are loaded lazily so that GET traffic never
+# pays for the PIL/TrustMark import chain. The parent directory is put on
+# sys.path so `common` imports as a regular package - the import system
+# then caches the module (and its __pycache__) instead of re-exec'ing
+# source the way the old spec_from_file_location shim did.
+@functools.lru_cache(maxsize=1)
+def _load_watermark_utils():
+    """Import common.watermark_utils once, on first use."""
+    parent_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), ".."))
+    if parent_dir not in sys.path:
+        sys.path.insert(0, parent_dir)
+    try:
+        # Prefer a compiled extension when the deployment ships one; the
+        # pure-Python module is the normal case
+        from common import watermark_utils_c as watermark_utils
+    except ImportError:
+        try:
+            from common import watermark_utils
+        except Exception:
+            logger.warning("Could not load watermark_utils module")
+            return None
+    return watermark_utils
 
 
-# Import common watermark utilities using importlib to avoid lambda keyword issues
-watermark_utils_spec = importlib.util.spec_from_file_location(
-    "watermark_utils",
-    os.path.join(os.path.dirname(__file__), "..", "common", "watermark_utils.py"),
-)
-if watermark_utils_spec and watermark_utils_spec.loader:
-    watermark_utils = importlib.util.module_from_spec(watermark_utils_spec)
-    watermark_utils_spec.loader.exec_module(watermark_utils)
-
-    # Make functions available in current module
-    extract_nano_id_from_watermark = watermark_utils.extract_nano_id_from_watermark
-    embed_watermark_to_image_data = watermark_utils.embed_watermark_to_image_data
-    verify_watermark_embedding = watermark_utils.verify_watermark_embedding
-else:
-    logger.warning("Could not load watermark_utils module")
-
-    # Fallback functions (will be replaced by common utils)
-    def extract_nano_id_from_watermark(image_data: bytes) -> Dict[str, Any]:
+def extract_nano_id_from_watermark(image_data: bytes) -> Dict[str, Any]:
+    watermark_utils = _load_watermark_utils()
+    if watermark_utils is None:
         return {"extractedId": None, "method": "fallback", "confidence": 0.0}
+    return watermark_utils.extract_nano_id_from_watermark(image_data)
+
 
-    def embed_watermark_to_image_data(image_data: bytes, nano_id: str) -> bytes:
+def embed_watermark_to_image_data(image_data: bytes, nano_id: str) -> bytes:
+    watermark_utils = _load_watermark_utils()
+    if watermark_utils is None:
         return image_data
+    return watermark_utils.embed_watermark_to_image_data(image_data, nano_id)
 
-    def verify_watermark_embedding(
-        image_data: bytes, expected_id: str
-    ) -> Dict[str, Any]:
+
+def verify_watermark_embedding(image_data: bytes, expected_id: str) -> Dict[str, Any]:
+    watermark_utils = _load_watermark_utils()
+    if watermark_utils is None:
         return {"extractedId": None, "method": "fallback", "confidence": 0.0}
+    return watermark_utils.verify_watermark_embedding(image_data, expected_id)
+
+
+# Response headers never vary per request, so build the dicts once; each
+# response still gets its own copy so callers can't mutate the constants
+_HTML_HEADERS = {
+    "Content-Type": "text/html; charset=utf-8",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
 
-# from trustmark import TrustMark  # Temporarily disabled
+_JSON_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST",
+    "Access-Control-Allow-Headers": "Content-Type",
+}
 
 
 def get_html_response(html_content: str) -> Dict[str, Any]:
     """Return an HTML response for API Gateway."""
     return {
         "statusCode": 200,
-        "headers": {
-            "Content-Type": "text/html; charset=utf-8",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST",
-            "Access-Control-Allow-Headers": "Content-Type",
-        },
+        "headers": dict(_HTML_HEADERS),
         "body": html_content,
     }
 
@@ -252,13 +509,8 @@ def get_json_response(data: Dict[str, Any], status_code: int = 200) -> Dict[str,
     """Return a JSON response for API Gateway."""
     return {
         "statusCode": status_code,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST",
-            "Access-Control-Allow-Headers": "Content-Type",
-        },
-        "body": json.dumps(data),
+        "headers": dict(_JSON_HEADERS),
+        "body": _json_dumps(data),
     }
 
 
@@ -268,6 +520,9 @@ def get_redirect_response(location: str) -> Dict[str, Any]:
         "statusCode": 302,
         "headers": {
             "Location": location,
+            # A given image always resolves to the same provenance URL, so
+            # let browsers reuse the redirect instead of re-invoking us
+            "Cache-Control": "public, max-age=3600",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, POST",
             "Access-Control-Allow-Headers": "Content-Type",
@@ -276,151 +531,182 @@ def get_redirect_response(location: str) -> Dict[str, Any]:
     }
 
 
+# Known magic-byte signatures, keyed on the prefix length each format needs.
+_SIGNATURES = {
+    b"\xff\xd8": ".jpg",
+    b"\x89PNG\r\n\x1a\n": ".png",
+    b"GIF87a": ".gif",
+    b"GIF89a": ".gif",
+}
+
+
 def get_file_extension_from_signature(image_data: bytes) -> str:
     """Detect file extension from image signature."""
-    if image_data[:2] == b"\xff\xd8":
-        return ".jpg"
-    elif image_data[:8] == b"\x89PNG\r\n\x1a\n":
-        return ".png"
-    elif image_data[:6] in (b"GIF87a", b"GIF89a"):
-        return ".gif"
-    elif image_data[:4] == b"RIFF" and image_data[8:12] == b"WEBP":
+    # One 12-byte read covers every signature, including RIFF....WEBP
+    head = bytes(image_data[:12])
+    ext = (
+        _SIGNATURES.get(head[:2])
+        or _SIGNATURES.get(head[:8])
+        or _SIGNATURES.get(head[:6])
+    )
+    if ext:
+        return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
         return ".webp"
-    else:
-        # Default to jpg if unknown
-        return ".jpg"
+    # Default to jpg if unknown
+    return ".jpg"
+
+
+@functools.lru_cache(maxsize=32)
+def _boundary(content_type: str) -> Optional[bytes]:
+    """Derive the multipart boundary bytes from a Content-Type header.
+
+    partition handles quoted boundaries and trailing parameters without
+    allocating the throwaway list split() builds; the result is memoized
+    since a warm Lambda sees only a handful of distinct boundaries.
+    """
+    boundary = (
+        content_type.partition("boundary=")[2].partition(";")[0].strip().strip('"')
+    )
+    if not boundary or not _BOUNDARY_RE.match(boundary):
+        return None
+    return boundary.encode("ascii")
+
 
+def extract_image_from_multipart(
+    body: bytes, content_type: str, is_base64: bool = False
+) -> Optional[bytes]:
+    """Extract image data from multipart form data.
 
-def extract_image_from_multipart(body: bytes, content_type: str) -> Optional[bytes]:
-    """Extract image data from multipart form data."""
+    When is_base64 is set the body is decoded straight to bytes here,
+    so API Gateway payloads never take a Unicode round trip.
+    """
     try:
-        boundary = content_type.split("boundary=")[1]
-        if not boundary:
-            logger.error("No boundary found in content-type: %s", content_type)
+        # Cheap O(1) guards before any body-sized work; base64 inflates
+        # the encoded form by 4/3, so scale the bound accordingly
+        if not content_type or "boundary=" not in content_type:
+            logger.error("Not a multipart content-type: %s", content_type)
+            return None
+        max_len = MAX_UPLOAD_BYTES * 4 // 3 + 4 if is_base64 else MAX_UPLOAD_BYTES
+        if len(body) > max_len:
+            logger.warning("Body too large: %d", len(body))
+            return None
+
+        if is_base64:
+            body = _decode_base64_body(body)
+
+        boundary = _boundary(content_type)
+        if boundary is None:
+            logger.error("No usable boundary in content-type: %s", content_type)
             return None
 
         logger.info("Parsing multipart with boundary: %s", boundary)
 
-        # Handle body that may have been corrupted by API Gateway
-        body_string: str
-        try:
-            # If body is UTF-8 encoded string data, try to recover
-            if isinstance(body, bytes):
-                # Try to decode as UTF-8 first, then re-encode as latin-1
-                try:
-                    body_string = body.decode("utf-8")
-                    logger.info("Successfully decoded body as UTF-8")
-                except UnicodeDecodeError:
-                    # If UTF-8 fails, try latin-1 directly
-                    body_string = body.decode("latin-1")
-                    logger.info("Successfully decoded body as latin-1")
-            else:
-                body_string = str(body)
-                logger.info("Body is already string")
-        except Exception as decode_error:
-            logger.error(f"Failed to decode body: {decode_error}")
+        # Operate on raw bytes throughout - binary image payloads never
+        # survive a str round-trip intact, and the old latin-1 decode/
+        # re-encode dance cost two full passes over a multi-MB body
+        if isinstance(body, str):
+            # API Gateway may hand over a str; latin-1 preserves byte values
+            body = body.encode("latin-1", errors="replace")
+
+        # Jump straight to the image field instead of walking (and logging)
+        # every part; the other form fields never need inspection
+        sep = b"--" + boundary
+
+        img_marker = body.find(b'name="image"')
+        if img_marker == -1:
+            logger.info("No image field found in multipart data")
             return None
 
-        # Split by boundary
-        parts = body_string.split(f"--{boundary}")
-
-        for i in range(
-            1, len(parts) - 1
-        ):  # Skip first empty part and last closing part
-            part = parts[i]
-
-            # Find headers section
-            header_end_index = part.find("\r\n\r\n")
-            if header_end_index == -1:
-                continue
-
-            headers = part[:header_end_index]
-            content = part[header_end_index + 4 :]
-
-            logger.info("Part headers: %s", headers)
-
-            # Check if this part contains the image field
-            if 'name="image"' in headers and "Content-Type: image/" in headers:
-                logger.info("Found image part, content length: %d", len(content))
-
-                # Convert string back to bytes, handling both cases
-                try:
-                    # First try latin-1 encoding to preserve byte values
-                    content_bytes = content.encode("latin-1")
-                    logger.info("Successfully encoded content as latin-1")
-                except UnicodeEncodeError:
-                    # If that fails, the content is already corrupted
-                    # Try to extract what we can
-                    content_bytes = content.encode("utf-8", errors="replace")
-                    logger.warning(
-                        "Content was corrupted, using UTF-8 with replacement"
-                    )
+        part_start = body.rfind(sep, 0, img_marker)
+        header_end_index = body.find(b"\r\n\r\n", img_marker)
+        if part_start == -1 or header_end_index == -1:
+            logger.info("Malformed part around image field")
+            return None
 
-                if len(content_bytes) >= 2 and content_bytes[-2:] == b"\r\n":
-                    content_bytes = content_bytes[:-2]
+        # Only the small header block is ever decoded to str
+        headers = body[part_start + len(sep) : header_end_index].decode(
+            "ascii", errors="replace"
+        )
+        if "Content-Type: image/" not in headers:
+            logger.info("Image field does not carry an image content type")
+            return None
 
-                logger.info("Extracted image data length: %d", len(content_bytes))
+        # The part's payload runs up to the next boundary marker; the
+        # preceding CRLF belongs to the protocol, not the image
+        data_start = header_end_index + 4
+        data_end = body.find(b"\r\n" + sep, data_start)
+        if data_end == -1:
+            logger.info("No closing boundary after image field")
+            return None
 
-                # Validate that this looks like image data
-                if content_bytes.startswith((b"\xff\xd8\xff", b"\x89PNG", b"GIF")):
-                    logger.info("Image data appears to be valid")
-                    return content_bytes
-                else:
-                    logger.warning(
-                        "Image data does not appear to be valid image format"
-                    )
-                    # Log the first few bytes for debugging
-                    logger.warning(f"First 20 bytes: {content_bytes[:20]}")
-                    # Try to return it anyway for debugging
-                    return content_bytes
+        logger.info("Extracted image data length: %d", data_end - data_start)
 
-        logger.info("No image field found in multipart data")
-        return None
+        # Validate the magic bytes through a memoryview so the check does
+        # not copy; the image itself is materialised exactly once below
+        head = bytes(memoryview(body)[data_start : data_start + 20])
+        if head.startswith((b"\xff\xd8\xff", b"\x89PNG", b"GIF")):
+            logger.info("Image data appears to be valid")
+        else:
+            logger.warning("Image data does not appear to be valid image format")
+            # Log the first few bytes for debugging
+            logger.debug("First 20 bytes: %s", head)
+            # Return it anyway for debugging
+        return body[data_start:data_end]
     except Exception as error:
         logger.error("Error extracting image from multipart: %s", error)
         return None
 
 
-async def get_provenance_data(post_id: str) -> Optional[Dict[str, Any]]:
-    """Get provenance data for a post ID."""
-    try:
-        logger.info("Looking up provenance data for postId: %s", post_id)
+@functools.lru_cache(maxsize=4096)
+def _provenance_exists(post_id: str) -> Optional[str]:
+    """Check whether a provenance page exists in S3 for the given post ID.
 
-        # Get provenance bucket name from environment variables
-        provenance_public_bucket = os.environ.get("PROVENANCE_PUBLIC_BUCKET")
-        if not provenance_public_bucket:
-            logger.warning("PROVENANCE_PUBLIC_BUCKET environment variable not set")
-            return None
+    Returns the page's LastModified timestamp (ISO string, possibly empty)
+    when it exists and None otherwise. Cached across warm invocations so
+    repeat verifications of the same post skip the head_object round trip.
+    Published provenance pages are immutable, so stale entries are harmless.
+    """
+    provenance_public_bucket = os.environ.get("PROVENANCE_PUBLIC_BUCKET")
+    if not provenance_public_bucket:
+        logger.warning("PROVENANCE_PUBLIC_BUCKET environment variable not set")
+        return None
 
-        # Check if provenance page exists in S3
-        try:
-            response = s3_client.head_object(
-                Bucket=provenance_public_bucket, Key=f"provenance/{post_id}/index.html"
-            )
+    try:
+        response = _s3().head_object(
+            Bucket=provenance_public_bucket, Key=f"provenance/{post_id}/index.html"
+        )
+    except ClientError as s3_error:
+        # head_object signals a missing key via ClientError 404, not NoSuchKey
+        if s3_error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            logger.info("No provenance data found for postId: %s", post_id)
+        else:
+            logger.error("S3 error checking provenance: %s", s3_error)
+        return None
+    except Exception as s3_error:
+        logger.error("S3 error checking provenance: %s", s3_error)
+        return None
 
-            logger.info("Found provenance data for postId: %s", post_id)
+    last_modified = response.get("LastModified")
+    return last_modified.isoformat() if last_modified else ""
 
-            # Return basic data indicating provenance exists
-            return {
-                "postId": post_id,
-                "provenanceUrl": f"https://{DOMAIN_NAME}/provenance/{post_id}",
-                "verified": True,
-                "timestamp": response.get("LastModified", "").isoformat()
-                if response.get("LastModified")
-                else "",
-            }
 
-        except s3_client.exceptions.NoSuchKey:
-            logger.info("No provenance data found for postId: %s", post_id)
-            return None
-        except Exception as s3_error:
-            logger.error("S3 error checking provenance: %s", s3_error)
-            return None
+def get_provenance_data(post_id: str) -> Optional[Dict[str, Any]]:
+    """Get provenance data for a post ID."""
+    logger.info("Looking up provenance data for postId: %s", post_id)
 
-    except Exception as error:
-        logger.error("Error getting provenance data: %s", error)
+    timestamp = _provenance_exists(post_id)
+    if timestamp is None:
         return None
 
+    logger.info("Found provenance data for postId: %s", post_id)
+    return {
+        "postId": post_id,
+        "provenanceUrl": f"https://{DOMAIN_NAME}/provenance/{post_id}",
+        "verified": True,
+        "timestamp": timestamp,
+    }
+
 
 def wrapWithLayout(
     title: str, content: str, currentPage: str = "", domainName: str = None
@@ -588,8 +874,8 @@ def wrapWithLayout(
 </html>"""
 
 
-def generate_upload_form_html() -> str:
-    """Generate the HTML form for watermark verification."""
+def _build_upload_form_html() -> str:
+    """Render the HTML form for watermark verification."""
     content = f"""
       <div class="hero bg-gradient-to-r from-primary to-secondary text-primary-content rounded-lg mb-8">
         <div class="hero-content text-center py-12">
@@ -756,8 +1042,48 @@ def generate_upload_form_html() -> str:
     )
 
 
-def generate_error_page(message: str) -> str:
-    """Generate an error page."""
+# The upload form has no per-request variables, so render it once at import
+# and serve the cached string on every GET. The Tailwind markup compresses
+# roughly 5x, so a gzipped copy is kept ready for clients that accept it.
+_UPLOAD_FORM_HTML = _build_upload_form_html()
+_UPLOAD_FORM_GZ_B64 = base64.b64encode(
+    gzip.compress(_UPLOAD_FORM_HTML.encode("utf-8"), 6)
+).decode("ascii")
+
+# API Gateway serializes the proxy response right after the handler returns and
+# never mutates it, so the GET branch can hand back the same frozen dicts on
+# every warm invoke instead of rebuilding them.
+_UPLOAD_FORM_RESPONSE = {
+    "statusCode": 200,
+    "headers": dict(_HTML_HEADERS),
+    "body": _UPLOAD_FORM_HTML,
+}
+_UPLOAD_FORM_RESPONSE_GZ = {
+    "statusCode": 200,
+    "headers": {**_HTML_HEADERS, "Content-Encoding": "gzip"},
+    "body": _UPLOAD_FORM_GZ_B64,
+    "isBase64Encoded": True,
+}
+
+
+def generate_upload_form_html() -> str:
+    """Return the (import-time rendered) HTML form for watermark verification."""
+    return _UPLOAD_FORM_HTML
+
+
+def get_upload_form_response(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the upload form, gzip-encoded when the client supports it."""
+    headers = event.get("headers") or {}
+    accept_encoding = headers.get("accept-encoding") or headers.get(
+        "Accept-Encoding", ""
+    )
+    if "gzip" in accept_encoding:
+        return _UPLOAD_FORM_RESPONSE_GZ
+    return _UPLOAD_FORM_RESPONSE
+
+
+def _build_error_page(message: str) -> str:
+    """Render an error page around the given message."""
     return f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
@@ -814,15 +1140,36 @@ def generate_error_page(message: str) -> str:
 </html>"""
 
 
-def generate_no_watermark_page(extraction_result: Dict[str, Any]) -> str:
-    """Generate a page for when no watermark is found."""
-    return f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{APP_NAME} - 透かしが見つかりません</title>
-    <style>
+# Pre-split the error page around its single dynamic slot so per-call work
+# is one string concatenation instead of re-rendering the whole template
+_ERROR_PAGE_SENTINEL = "\x00MESSAGE\x00"
+_ERROR_PAGE_PREFIX, _, _ERROR_PAGE_SUFFIX = _build_error_page(
+    _ERROR_PAGE_SENTINEL
+).partition(_ERROR_PAGE_SENTINEL)
+
+
+@functools.lru_cache(maxsize=32)
+def generate_error_page(message: str) -> str:
+    """Generate an error page.
+
+    The handler only ever passes a handful of fixed messages, so each
+    page is assembled once and the shared string served thereafter.
+    """
+    return _ERROR_PAGE_PREFIX + html.escape(message) + _ERROR_PAGE_SUFFIX
+
+
+# Rejecting a non-multipart POST needs no per-request data, so the whole
+# response dict is assembled once (same sharing rationale as the frozen
+# upload-form responses).
+_ERR_INVALID_FORMAT = get_html_response(
+    generate_error_page("無効なリクエスト形式です。")
+)
+
+
+# Static page shells. The two result pages share all of their page CSS;
+# the shell and shared styles are assembled once at import via placeholder
+# replacement, leaving format_map with only the per-request fields.
+_SHARED_CSS = """\
         body {{
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
             max-width: 600px;
@@ -837,15 +1184,6 @@ def generate_no_watermark_page(extraction_result: Dict[str, Any]) -> str:
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
             text-align: center;
         }}
-        .warning-icon {{
-            font-size: 64px;
-            color: #f39c12;
-            margin-bottom: 20px;
-        }}
-        h1 {{
-            color: #e67e22;
-            margin-bottom: 20px;
-        }}
         .details {{
             background-color: #f8f9fa;
             border-radius: 6px;
@@ -865,19 +1203,58 @@ def generate_no_watermark_page(extraction_result: Dict[str, Any]) -> str:
         }}
         .back-btn:hover {{
             background-color: #2980b9;
-        }}
+        }}"""
+
+_PAGE_SHELL = """<!DOCTYPE html>
+<html lang="ja">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{APP_NAME} - __TITLE__</title>
+    <style>
+__SHARED_CSS__
+__EXTRA_CSS__
     </style>
 </head>
 <body>
     <div class="container">
+__BODY__
+    </div>
+</body>
+</html>"""
+
+
+def _page_template(title: str, extra_css: str, body: str) -> str:
+    """Compose a page template from the shared shell (import-time only)."""
+    return (
+        _PAGE_SHELL.replace("__SHARED_CSS__", _SHARED_CSS)
+        .replace("__TITLE__", title)
+        .replace("__EXTRA_CSS__", extra_css)
+        .replace("__BODY__", body)
+    )
+
+
+_NO_WATERMARK_TMPL = _page_template(
+    "透かしが見つかりません",
+    """\
+        .warning-icon {{
+            font-size: 64px;
+            color: #f39c12;
+            margin-bottom: 20px;
+        }}
+        h1 {{
+            color: #e67e22;
+            margin-bottom: 20px;
+        }}""",
+    """\
         <div class="warning-icon">⚠️</div>
         <h1>透かしが見つかりません</h1>
         <p>アップロードされた画像から{APP_NAME}透かしを検出できませんでした。</p>
-        
+
         <div class="details">
             <h3>検証詳細</h3>
-            <p><strong>検証方法:</strong> {extraction_result.get("method", "不明")}</p>
-            <p><strong>信頼度:</strong> {(extraction_result.get("confidence", 0) * 100):.1f}%</p>
+            <p><strong>検証方法:</strong> {method}</p>
+            <p><strong>信頼度:</strong> {confidence:.1f}%</p>
             <p><strong>可能な原因:</strong></p>
             <ul>
                 <li>この画像は{APP_NAME}で投稿されていない</li>
@@ -885,36 +1262,30 @@ def generate_no_watermark_page(extraction_result: Dict[str, Any]) -> str:
                 <li>透かし埋め込み処理に問題があった</li>
             </ul>
         </div>
-        
-        <button class="back-btn" onclick="history.back()">別の画像を試す</button>
-    </div>
-</body>
-</html>"""
 
+        <button class="back-btn" onclick="history.back()">別の画像を試す</button>""",
+)
 
-def generate_no_provenance_page(post_id: str, extraction_result: Dict[str, Any]) -> str:
-    """Generate a page for when provenance data is not found."""
-    return f"""<!DOCTYPE html>
-<html lang="ja">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{APP_NAME} - 来歴が見つかりません</title>
-    <style>
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            max-width: 600px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }}
-        .container {{
-            background: white;
-            border-radius: 12px;
-            padding: 30px;
-            box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            text-align: center;
-        }}
+
+@functools.lru_cache(maxsize=128)
+def _render_no_watermark_page(method: str, confidence: float) -> str:
+    return _NO_WATERMARK_TMPL.format_map(
+        {"APP_NAME": APP_NAME, "method": method, "confidence": confidence}
+    )
+
+
+def generate_no_watermark_page(extraction_result: Dict[str, Any]) -> str:
+    """Generate a page for when no watermark is found."""
+    # Round the cache key so near-identical confidences share a render
+    return _render_no_watermark_page(
+        extraction_result.get("method", "不明"),
+        round(extraction_result.get("confidence", 0) * 100, 3),
+    )
+
+
+_NO_PROVENANCE_TMPL = _page_template(
+    "来歴が見つかりません",
+    """\
         .info-icon {{
             font-size: 64px;
             color: #3498db;
@@ -924,46 +1295,23 @@ def generate_no_provenance_page(post_id: str, extraction_result: Dict[str, Any])
             color: #2c3e50;
             margin-bottom: 20px;
         }}
-        .details {{
-            background-color: #f8f9fa;
-            border-radius: 6px;
-            padding: 15px;
-            margin: 20px 0;
-            text-align: left;
-        }}
         .post-id {{
             font-family: 'Courier New', monospace;
             background-color: #e9ecef;
             padding: 5px 8px;
             border-radius: 4px;
             font-weight: bold;
-        }}
-        .back-btn {{
-            background-color: #3498db;
-            color: white;
-            border: none;
-            padding: 12px 24px;
-            border-radius: 6px;
-            cursor: pointer;
-            font-size: 16px;
-            margin-top: 20px;
-        }}
-        .back-btn:hover {{
-            background-color: #2980b9;
-        }}
-    </style>
-</head>
-<body>
-    <div class="container">
+        }}""",
+    """\
         <div class="info-icon">🔍</div>
         <h1>来歴データが見つかりません</h1>
         <p>透かしから投稿IDは検出されましたが、対応する来歴データが見つかりませんでした。</p>
-        
+
         <div class="details">
             <h3>検出情報</h3>
             <p><strong>検出された投稿ID:</strong> <span class="post-id">{post_id}</span></p>
-            <p><strong>検証方法:</strong> {extraction_result.get("method", "不明")}</p>
-            <p><strong>信頼度:</strong> {(extraction_result.get("confidence", 0) * 100):.1f}%</p>
+            <p><strong>検証方法:</strong> {method}</p>
+            <p><strong>信頼度:</strong> {confidence:.1f}%</p>
             <p><strong>可能な原因:</strong></p>
             <ul>
                 <li>投稿データが削除されている</li>
@@ -971,68 +1319,121 @@ def generate_no_provenance_page(post_id: str, extraction_result: Dict[str, Any])
                 <li>データベースの同期問題</li>
             </ul>
         </div>
-        
-        <button class="back-btn" onclick="history.back()">別の画像を試す</button>
-    </div>
-</body>
-</html>"""
+
+        <button class="back-btn" onclick="history.back()">別の画像を試す</button>""",
+)
+
+
+@functools.lru_cache(maxsize=128)
+def _render_no_provenance_page(post_id: str, method: str, confidence: float) -> str:
+    return _NO_PROVENANCE_TMPL.format_map(
+        {
+            "APP_NAME": APP_NAME,
+            "post_id": post_id,
+            "method": method,
+            "confidence": confidence,
+        }
+    )
+
+
+def generate_no_provenance_page(post_id: str, extraction_result: Dict[str, Any]) -> str:
+    """Generate a page for when provenance data is not found."""
+    return _render_no_provenance_page(
+        post_id,
+        extraction_result.get("method", "不明"),
+        round(extraction_result.get("confidence", 0) * 100, 3),
+    )
+
+
+# Decode window for base64 bodies; must stay a multiple of 4 so each
+# window is a self-contained run of base64 quads.
+_B64_CHUNK = 65536
+
+
+def _decode_base64_body(raw_body: str) -> bytes:
+    """Decode a base64 request body in fixed windows.
+
+    A single b64decode of a 10 MB body materialises the whole decoded
+    copy on top of the encoded string. Decoding in 64 KB windows into a
+    bytearray keeps the transient decode buffers tiny and lets the
+    result grow in place.
+    """
+    decoded = bytearray()
+    for i in range(0, len(raw_body), _B64_CHUNK):
+        decoded += base64.b64decode(raw_body[i : i + _B64_CHUNK])
+    return bytes(decoded)
 
 
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda handler for watermark verification.
     """
-    logger.info("Verify watermark handler starting...")
-    logger.info("Event received: %s", json.dumps(event, default=str))
+    # Dispatch on method before doing any logging work: GET just serves
+    # the cached form and needs none of the event dump
+    http_method = event.get("httpMethod", "GET")
 
-    try:
-        # Get HTTP method
-        http_method = event.get("httpMethod", "GET")
+    if http_method == "GET":
+        # Display upload form
+        return get_upload_form_response(event)
 
-        if http_method == "GET":
-            # Display upload form
-            return get_html_response(generate_upload_form_html())
+    logger.info(
+        "Event: method=%s path=%s bodyLen=%d isB64=%s",
+        http_method,
+        event.get("path"),
+        len(event.get("body") or ""),
+        event.get("isBase64Encoded", False),
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        # Serializing the full event duplicates the (possibly multi-MB,
+        # base64-encoded) body into CloudWatch, so redact it.
+        safe_event = {k: v for k, v in event.items() if k != "body"}
+        safe_event["bodyLen"] = len(event.get("body") or "")
+        logger.debug("POST event: %s", _json_dumps(safe_event, default=str))
 
-        elif http_method == "POST":
-            # Process uploaded image and extract watermark
-            content_type = event.get("headers", {}).get("content-type") or event.get(
-                "headers", {}
-            ).get("Content-Type", "")
+    try:
+        if http_method == "POST":
+            # Process uploaded image and extract watermark. API Gateway
+            # forwards header names in whatever casing the client sent,
+            # so normalize once instead of probing each spelling.
+            headers = {k.lower(): v for k, v in (event.get("headers") or {}).items()}
+            content_type = headers.get("content-type", "")
 
-            if not content_type or "multipart/form-data" not in content_type:
-                return get_html_response(
-                    generate_error_page("無効なリクエスト形式です。")
-                )
+            # RFC 7578: the type always leads, so a prefix check suffices
+            if not content_type.startswith("multipart/form-data"):
+                return _ERR_INVALID_FORMAT
 
             # Parse multipart form data
             raw_body = event.get("body", "")
+            is_base64 = event.get("isBase64Encoded", False)
             logger.info(
-                f"Body type: {type(raw_body)}, isBase64Encoded: {event.get('isBase64Encoded', False)}"
+                "Body type: %s, isBase64Encoded: %s", type(raw_body), is_base64
             )
 
-            if event.get("isBase64Encoded", False):
-                body = base64.b64decode(raw_body)
-                logger.info(f"Decoded base64 body length: {len(body)}")
+            if is_base64:
+                # Decoded inside the parser - no Unicode round trip
+                body = raw_body
+            elif isinstance(raw_body, str):
+                # API Gateway may have already decoded the body; latin-1
+                # preserves byte values 1:1 and, with "replace", never
+                # raises - one C-fast encode instead of the old
+                # iso-8859-1/utf-8 try/except cascade
+                body = raw_body.encode("latin-1", "replace")
             else:
-                # Body is already a string from API Gateway
-                if isinstance(raw_body, str):
-                    # API Gateway may have already decoded the body incorrectly
-                    # Try to get raw bytes by re-encoding with ISO-8859-1 which preserves byte values
-                    try:
-                        body = raw_body.encode("iso-8859-1")
-                        logger.info(f"Encoded body length with iso-8859-1: {len(body)}")
-                    except UnicodeEncodeError as e:
-                        logger.error(f"Failed to encode body with iso-8859-1: {e}")
-                        # Fallback: encode as UTF-8 with error handling
-                        body = raw_body.encode("utf-8", errors="replace")
-                        logger.info(
-                            f"Encoded body length with utf-8 (fallback): {len(body)}"
-                        )
-                else:
-                    body = raw_body
-                    logger.info(f"Body is already bytes, length: {len(body)}")
+                body = raw_body
 
-            image_data = extract_image_from_multipart(body, content_type)
+            max_len = MAX_UPLOAD_BYTES * 4 // 3 + 4 if is_base64 else MAX_UPLOAD_BYTES
+            if len(body) > max_len:
+                logger.warning("Rejecting oversized upload (%d bytes)", len(body))
+                return get_html_response(generate_error_page("画像が大きすぎます。"))
+
+            image_data = extract_image_from_multipart(
+                body, content_type, is_base64=is_base64
+            )
+            # Drop the raw-body references before the multi-second
+            # extraction phase so the encoded copy can be collected;
+            # only the image slice needs to stay resident
+            raw_body = body = None
+            event["body"] = None
 
             if not image_data:
                 logger.warning("Failed to extract image data from multipart form")
@@ -1042,40 +1443,58 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
             logger.info("Processing uploaded image (%d bytes)", len(image_data))
 
+            # Content-addressed idempotency: an identical upload reuses
+            # the stored result instead of re-running extraction
+            image_sha = hashlib.sha256(image_data).hexdigest()
+            cached_result = _cached_result_for_hash(image_sha)
+
             # Generate verification ID
-            verification_id = str(uuid.uuid4())
-            logger.info(f"Generated verification ID: {verification_id}")
+            # .hex skips UUID.__str__'s dash formatting; downstream
+            # consumers (DynamoDB key, query string) treat the id as opaque
+            verification_id = uuid.uuid4().hex
+            logger.info("Generated verification ID: %s", verification_id)
 
             # Save initial status to DynamoDB
             logger.info(
-                f"Saving initial status to DynamoDB table: {VERIFICATION_RESULTS_TABLE}"
+                "Saving initial status to DynamoDB table: %s",
+                VERIFICATION_RESULTS_TABLE,
             )
             save_verification_result(verification_id, "started")
 
             # Process watermark synchronously (with 15 minute timeout)
             logger.info("Starting synchronous watermark processing")
             try:
-                process_watermark_async(verification_id, image_data)
+                if cached_result is not None:
+                    logger.info("Reusing cached result for sha256:%s", image_sha)
+                    save_verification_result(
+                        verification_id, "completed", result_data=cached_result
+                    )
+                else:
+                    result_data = process_watermark_async(verification_id, image_data)
+                    if result_data is not None:
+                        save_verification_result(
+                            "sha256:" + image_sha, "completed", result_data=result_data
+                        )
                 logger.info("Watermark processing completed successfully")
 
                 # Return immediate response with verification ID
                 response_data = {
                     "verification_id": verification_id,
                     "status": "completed",
-                    "message": "透かし検証が完了しました。結果確認はcheck-resultエンドポイントをご利用ください。",
-                    "check_url": f"https://{DOMAIN_NAME}/check-result?id={verification_id}",
+                    "message": _SUCCESS_MSG,
+                    "check_url": _CHECK_URL_PREFIX + verification_id,
                 }
 
             except Exception as processing_error:
-                logger.error(f"Error during watermark processing: {processing_error}")
+                logger.error("Error during watermark processing: %s", processing_error)
                 response_data = {
                     "verification_id": verification_id,
                     "status": "error",
-                    "message": "透かし検証中にエラーが発生しました。結果確認はcheck-resultエンドポイントをご利用ください。",
-                    "check_url": f"https://{DOMAIN_NAME}/check-result?id={verification_id}",
+                    "message": _ERROR_MSG,
+                    "check_url": _CHECK_URL_PREFIX + verification_id,
                 }
 
-            logger.info(f"Returning JSON response: {response_data}")
+            logger.debug("Returning JSON response: %s", response_data)
             return get_json_response(response_data)
 
         else:
@@ -1088,3 +1507,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return get_html_response(
             generate_error_page("内部サーバーエラーが発生しました。")
         )
+
+
+# On Lambda, pull the extraction stack in during the INIT phase so the
+# first POST doesn't pay the PIL/TrustMark import and weight load; the
+# module's own warm block then preloads the model singleton. Local and
+# test runs keep the lazy path.
+if os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    _load_watermark_utils()
@@ -25,31 +25,39 @@ IMAGE_PATHS = [
 TEST_POST_ID = "abc12345"
 
 
-# parametrizeデコレータで、3つの画像パスそれぞれに対してテストを実行
-@pytest.mark.parametrize("image_path", IMAGE_PATHS)
-def test_embed_and_extract_watermark(image_path):
-    """
-    電子透かしの埋め込みと抽出が正常に行えるかをテストする。
-    Test A: embed_watermark_to_image_data
-    Test B: extract_nano_id_from_watermark
-    """
+# TrustMarkのロードを含む重いimportはセッションにつき一度だけ実行する
+@pytest.fixture(scope="session")
+def watermark_functions():
     # 動的インポートでSyntaxErrorを回避
     embed_module = importlib.import_module("lambda.batch.embed_watermark")
-    embed_watermark_to_image_data = embed_module.embed_watermark_to_image_data
     verify_module = importlib.import_module("lambda.verify_watermark.handler")
-    extract_nano_id_from_watermark = verify_module.extract_nano_id_from_watermark
-    # --- テスト準備 ---
-    assert image_path.exists(), f"テスト画像が見つかりません: {image_path}"
+    return (
+        embed_module.embed_watermark_to_image_data,
+        verify_module.extract_nano_id_from_watermark,
+    )
+
 
-    # 元の画像データを読み込む
-    with open(image_path, "rb") as f:
-        original_image_data = f.read()
+# 各画像のPNG変換はセッションにつき一度だけ行い、テスト間で共有する
+@pytest.fixture(scope="session", params=IMAGE_PATHS, ids=lambda p: p.name)
+def png_image_data(request):
+    image_path = request.param
+    assert image_path.exists(), f"テスト画像が見つかりません: {image_path}"
 
     # すべての画像をPNG形式に変換してテストの一貫性を保つ
     with Image.open(image_path).convert("RGB") as img:
         with io.BytesIO() as output:
             img.save(output, format="PNG")
-            original_image_data = output.getvalue()
+            return output.getvalue()
+
+
+def test_embed_and_extract_watermark(watermark_functions, png_image_data):
+    """
+    電子透かしの埋め込みと抽出が正常に行えるかをテストする。
+    Test A: embed_watermark_to_image_data
+    Test B: extract_nano_id_from_watermark
+    """
+    embed_watermark_to_image_data, extract_nano_id_from_watermark = watermark_functions
+    original_image_data = png_image_data
 
     # --- テストA: 電子透かしの埋め込み ---
     # 新しい仕様では Post IDを直接渡す